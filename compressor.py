@@ -9,20 +9,101 @@ Emoji压缩转换工具
 
 import os
 import json
+import hashlib
+import struct
 import subprocess
 import shutil
+import sys
 import argparse
-from pathlib import Path
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import SimpleNamespace
 from datetime import datetime
 
+# Pillow为可选依赖：用于在进程内完成解码和尺寸调整 (可替换为pillow-simd)
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# 旧版Pillow需要pillow-avif-plugin才能读取AVIF
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# orjson为可选依赖：加速大批量报告的序列化
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 外部转换工具
+TOOL_NAMES = ('avifenc', 'avifdec', 'dwebp', 'cwebp', 'sips', 'convert', 'magick')
+
+# 参与处理的图片扩展名 (不区分大小写)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.avif', '.gif')
+
+# 文件头签名: (前缀, 格式)
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+)
+# AVIF的ftyp主品牌 (静态图/图像序列)
+AVIF_BRANDS = (b'avif', b'avis')
+
+# 输出目录中的增量缓存文件: 输入指纹 -> 输出文件相对路径及其stat信息
+CACHE_FILENAME = '.emoji-cache.json'
+# 输出目录中临时文件的前缀
+TEMP_OUTPUT_PREFIX = '.emoji-tmp-'
+# 读取文件头使用的缓冲区大小 (格式检测12字节，WebP尺寸解析30字节)
+HEADER_BUFFER_SIZE = 32
+# 流水线各阶段之间排队等待的最大文件数
+PIPELINE_QUEUE_SIZE = 8
+# 输出扩展名 -> 报告中的格式名
+OUTPUT_FORMATS = {'.avif': 'AVIF', '.webp': 'WebP'}
+
+
+def _dumps_json(data, indent=True):
+    """将数据序列化为UTF-8字节 (优先使用orjson)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def _which(tool):
+    """查找工具路径，同一进程内多次创建压缩器时复用结果"""
+    return shutil.which(tool)
+
+
 class EmojiCompressor:
     def __init__(self, input_dir="origins", output_dir="output",
-                 target_size=60, quality=50, verbose=True):
+                 target_size=60, quality=50, verbose=True, jobs=None, use_cache=True):
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.target_size = target_size
         self.quality = quality
         self.verbose = verbose
+        # 并发处理的文件数 (默认: CPU核心数)
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        # 单个编码器可用的线程数，保证总线程数约等于CPU核心数
+        self.encoder_threads = max(1, (os.cpu_count() or 1) // self.jobs)
+        self._print_lock = threading.Lock()
+        # 跳过内容和参数均未变化的文件
+        self.use_cache = use_cache
+        # 指纹 -> [输出相对路径, inode, 大小, 修改时间]，以及反向的输出相对路径 -> 当前内容的指纹
+        self._cache = {}
+        self._cache_owners = {}
+        self._fingerprints = {}
+        # 保证缓存记录与输出文件的替换同时生效
+        self._cache_lock = threading.RLock()
 
         # 平台目录映射 (现在origins目录已统一为英文名)
         self.platform_mapping = {
@@ -34,64 +115,209 @@ class EmojiCompressor:
             'weibo': 'weibo'
         }
 
+        # 文件格式检测缓存: (设备, inode, 修改时间) -> 格式
+        self._format_cache = {}
+        # 已创建的输出目录
+        self._created_dirs = set()
+        # 各线程复用的文件头缓冲区
+        self._thread_local = threading.local()
+
         # 检查并初始化工具
         self.available_tools = self._check_tools()
+        # 工具可用性标记，避免在热路径上做列表查找
+        self.has = SimpleNamespace(
+            **{tool: tool in self.tools for tool in TOOL_NAMES},
+            pillow=Image is not None
+        )
+        self._build_pipeline()
 
     def _print(self, message, force=False):
-        """条件打印"""
-        if self.verbose or force:
-            print(message)
+        """条件打印 (线程安全)，处理单个文件期间先写入当前线程的缓冲区"""
+        if not (self.verbose or force):
+            return
+
+        log_buf = getattr(self._thread_local, 'log_buf', None)
+        if log_buf is not None:
+            log_buf.append(message)
+        else:
+            self._write_log([message])
+
+    def _write_log(self, lines):
+        """加锁后一次性写出多行输出"""
+        with self._print_lock:
+            sys.stdout.write('\n'.join(lines) + '\n')
+
+    def _begin_log(self, log_buf=None):
+        """开始缓冲当前线程的输出，可传入已有缓冲区以便在流水线线程间接力"""
+        self._thread_local.log_buf = [] if log_buf is None else log_buf
+
+    def _end_log(self):
+        """停止缓冲当前线程的输出，返回已缓冲的消息"""
+        log_buf = getattr(self._thread_local, 'log_buf', None)
+        self._thread_local.log_buf = None
+        return log_buf
+
+    def _flush_log(self):
+        """停止缓冲，并将该文件的所有输出一次写出，避免多线程频繁争用stdout"""
+        log_buf = self._end_log()
+        if log_buf:
+            self._write_log(log_buf)
 
     def _check_tools(self):
-        """检查可用的转换工具"""
-        tools = {
-            'avifenc': shutil.which('avifenc'),
-            'avifdec': shutil.which('avifdec'),
-            'dwebp': shutil.which('dwebp'),
-            'cwebp': shutil.which('cwebp'),
-            'sips': shutil.which('sips'),
-            'convert': shutil.which('convert'),
-            'magick': shutil.which('magick')
-        }
+        """检查可用的转换工具，记录找到的工具路径"""
+        # 解析后的绝对路径，执行命令时不必再次搜索PATH
+        self.tools = {}
 
         available = []
-        for tool, path in tools.items():
+        for tool in TOOL_NAMES:
+            path = _which(tool)
             if path:
+                self.tools[tool] = path
                 available.append(tool)
                 self._print(f"✅ 找到 {tool}: {path}")
             else:
                 self._print(f"❌ 未找到 {tool}")
 
+        if Image is not None:
+            available.append('pillow')
+            self._print(f"✅ 找到 Pillow: {Image.__version__}")
+        else:
+            self._print(f"❌ 未找到 Pillow (可选: pip install pillow)")
+
         return available
 
-    def _detect_image_format(self, file_path):
-        """检测文件的实际格式"""
+    def _build_pipeline(self):
+        """根据可用工具一次性确定各阶段使用的处理函数，避免逐文件判断"""
+        # 原始格式 -> (显示名称, 转换为PNG的函数)
+        self._decoders = {}
+        if self.has.dwebp:
+            self._decoders['webp'] = ('WebP', self._convert_webp_to_png)
+        if self.has.avifdec:
+            self._decoders['avif'] = ('AVIF', self._convert_avif_to_png)
+
+        # 按优先级排列的尺寸调整工具: (显示名称, 函数)
+        self._resizers = []
+        if self.has.sips:
+            self._resizers.append(('sips', self._resize_with_sips))
+        if self.has.convert or self.has.magick:
+            self._resizers.append(('ImageMagick', self._resize_with_imagemagick))
+
+        # 按优先级排列的编码器: (格式名称, 扩展名, 函数)
+        self._encoders = []
+        if self.has.avifenc:
+            self._encoders.append(('AVIF', '.avif', self._convert_png_to_avif))
+        if self.has.cwebp:
+            self._encoders.append(('WebP', '.webp', self._convert_png_to_webp))
+
+    def _read_header(self, file_path, size):
+        """读取文件头到当前线程复用的缓冲区，返回memoryview (在下次读取前有效)"""
+        buffer = getattr(self._thread_local, 'header_buffer', None)
+        if buffer is None:
+            buffer = self._thread_local.header_buffer = memoryview(bytearray(HEADER_BUFFER_SIZE))
+
+        view = buffer[:size]
+        # Windows下需要O_BINARY，否则按文本模式读取会转换\r\n并在\x1a处截断
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(12)
-
-                # WebP格式检测
-                if header.startswith(b'RIFF') and b'WEBP' in header:
-                    return 'webp'
-                # PNG格式检测
-                elif header.startswith(b'\x89PNG\r\n\x1a\n'):
-                    return 'png'
-                # JPEG格式检测
-                elif header.startswith(b'\xff\xd8\xff'):
-                    return 'jpeg'
-                # AVIF格式检测
-                elif b'ftyp' in header and b'avif' in header:
-                    return 'avif'
-                else:
-                    return 'unknown'
+            if hasattr(os, 'readv'):
+                length = os.readv(fd, [view])
+            else:
+                # 无readv的平台 (Windows) 退回普通读取
+                data = os.read(fd, size)
+                length = len(data)
+                view[:length] = data
+        finally:
+            os.close(fd)
+        return view[:length]
+
+    def _detect_image_format(self, file_path, st=None):
+        """检测文件的实际格式 (按inode和修改时间缓存)
+
+        st: 调用方已有的stat结果，避免重复stat
+        """
+        try:
+            if st is None:
+                st = os.stat(file_path)
+            cache_key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+            cached = self._format_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            header = self._read_header(file_path, 12)
         except:
             return 'unknown'
 
+        image_format = 'unknown'
+        # PNG/JPEG按固定前缀检测
+        for signature, fmt in IMAGE_SIGNATURES:
+            if header[:len(signature)] == signature:
+                image_format = fmt
+                break
+        else:
+            # WebP: RIFF容器，偏移8处为WEBP标识
+            if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+                image_format = 'webp'
+            # AVIF: ISO-BMFF的ftyp盒，偏移8处为主品牌
+            elif header[4:8] == b'ftyp' and header[8:12] in AVIF_BRANDS:
+                image_format = 'avif'
+
+        self._format_cache[cache_key] = image_format
+        return image_format
+
     def _resize_with_sips(self, input_file, output_file, size):
         """使用macOS sips调整图片尺寸"""
         try:
-            cmd = ['sips', '-Z', str(size), input_file, '--out', output_file]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = [self.tools['sips'], '-Z', str(size), input_file, '--out', output_file]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return result.returncode == 0
+        except:
+            return False
+
+    def _resize_with_pillow(self, input_file, size):
+        """使用Pillow在进程内解码并调整图片尺寸，返回RGB/RGBA图像 (失败返回None)"""
+        if not self.has.pillow:
+            return None
+
+        try:
+            with Image.open(input_file) as img:
+                # 统一为RGB/RGBA，仅在有透明信息时保留透明通道
+                # RGB模式的PNG也可能带有tRNS色键透明，同样需要转换为RGBA
+                has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+                target_mode = 'RGBA' if has_alpha else 'RGB'
+                if img.mode != target_mode:
+                    img = img.convert(target_mode)
+                return ImageOps.contain(img, (size, size), Image.LANCZOS)
+        except:
+            return None
+
+    def _image_to_y4m(self, image):
+        """将RGB/RGBA图像转换为单帧Y4M (4:4:4，全范围BT.601，透明通道使用C444alpha)"""
+        width, height = image.size
+        planes = list(image.convert('RGB').convert('YCbCr').split())
+        colorspace = 'C444'
+        if image.mode == 'RGBA':
+            planes.append(image.getchannel('A'))
+            colorspace = 'C444alpha'
+
+        header = f'YUV4MPEG2 W{width} H{height} F25:1 Ip A1:1 {colorspace} XCOLORRANGE=FULL\nFRAME\n'
+        return header.encode('ascii') + b''.join(plane.tobytes() for plane in planes)
+
+    def _convert_image_to_avif(self, image, avif_file):
+        """将Pillow图像以Y4M格式经stdin送入avifenc，省去中间PNG的压缩和解压"""
+        if not self.has.avifenc:
+            return False
+
+        try:
+            cmd = [
+                self.tools['avifenc'],
+                '-j', str(self.encoder_threads),
+                '-q', str(self.quality),
+                '-s', '6',
+                '--stdin',
+                avif_file
+            ]
+            result = subprocess.run(cmd, input=self._image_to_y4m(image),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return result.returncode == 0
         except:
             return False
@@ -101,196 +327,744 @@ class EmojiCompressor:
         tools_to_try = ['convert', 'magick']
 
         for tool in tools_to_try:
-            if tool in self.available_tools:
+            if tool in self.tools:
                 try:
-                    if tool == 'convert':
-                        cmd = ['convert', input_file, '-resize', f'{size}x{size}', output_file]
-                    else:  # magick
-                        cmd = ['magick', input_file, '-resize', f'{size}x{size}', output_file]
+                    cmd = [self.tools[tool], input_file, '-resize', f'{size}x{size}', output_file]
 
-                    result = subprocess.run(cmd, capture_output=True, text=True)
+                    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                     if result.returncode == 0:
                         return True
                 except:
                     continue
         return False
 
-    def _convert_webp_to_png(self, webp_file, png_file):
-        """使用dwebp将WebP转换为PNG"""
-        if 'dwebp' not in self.available_tools:
+    def _run_pipeline(self, stages):
+        """串联执行多个命令，前一个命令的stdout直接作为后一个命令的stdin"""
+        processes = []
+        try:
+            upstream = None
+            for index, cmd in enumerate(stages):
+                is_last = index == len(stages) - 1
+                process = subprocess.Popen(
+                    cmd,
+                    stdin=upstream,
+                    stdout=subprocess.DEVNULL if is_last else subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+                if upstream is not None:
+                    # 关闭父进程持有的管道端，下游退出时上游才能收到SIGPIPE
+                    upstream.close()
+                upstream = process.stdout
+                processes.append(process)
+
+            return_codes = [process.wait() for process in processes]
+            return all(code == 0 for code in return_codes)
+        except:
+            for process in processes:
+                process.kill()
+                process.wait()
+            return False
+
+    def _resize_webp_with_pipeline(self, webp_file, output_file, size):
+        """dwebp解码结果经管道送入ImageMagick调整尺寸，省去中间PNG文件"""
+        if not self.has.dwebp:
+            return False
+
+        for tool in ['convert', 'magick']:
+            if tool in self.tools:
+                return self._run_pipeline([
+                    [self.tools['dwebp'], webp_file, '-o', '-'],
+                    [self.tools[tool], 'png:-', '-resize', f'{size}x{size}', output_file]
+                ])
+        return False
+
+    def _batch_resize_imagemagick(self, input_dir, output_dir, size):
+        """使用ImageMagick mogrify一次性调整目录中所有PNG的尺寸"""
+        if not self.has.magick:
+            return False
+
+        try:
+            # 通配符由ImageMagick自行展开，避免命令行长度限制
+            cmd = [
+                self.tools['magick'], 'mogrify',
+                '-resize', f'{size}x{size}',
+                '-path', output_dir,
+                '-format', 'png',
+                os.path.join(input_dir, '*.png')
+            ]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return result.returncode == 0
+        except:
+            return False
+
+    def _convert_webp_to_png(self, webp_file, png_file, resize=None):
+        """使用dwebp将WebP转换为PNG
+
+        resize: (宽, 高)，提供时由libwebp在解码的同时调整尺寸
+        """
+        if not self.has.dwebp:
             return False
 
         try:
-            cmd = ['dwebp', webp_file, '-o', png_file]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = [self.tools['dwebp'], webp_file, '-o', png_file]
+            if resize is not None:
+                cmd[2:2] = ['-resize', str(resize[0]), str(resize[1])]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return result.returncode == 0
         except:
             return False
 
     def _convert_avif_to_png(self, avif_file, png_file):
         """使用avifdec将AVIF转换为PNG"""
-        if 'avifdec' not in self.available_tools:
+        if not self.has.avifdec:
             return False
 
         try:
-            cmd = ['avifdec', avif_file, png_file]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = [self.tools['avifdec'], avif_file, png_file]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return result.returncode == 0
         except:
             return False
 
     def _convert_png_to_avif(self, png_file, avif_file):
         """使用avifenc将PNG转换为AVIF"""
-        if 'avifenc' not in self.available_tools:
+        if not self.has.avifenc:
             return False
 
         try:
             cmd = [
-                'avifenc',
+                self.tools['avifenc'],
+                '-j', str(self.encoder_threads),
                 '-q', str(self.quality),
                 '-s', '6',
                 png_file,
                 avif_file
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return result.returncode == 0
         except:
             return False
 
-    def _convert_png_to_webp(self, png_file, webp_file):
-        """使用cwebp将PNG转换为WebP"""
-        if 'cwebp' not in self.available_tools:
+    def _convert_png_to_webp(self, png_file, webp_file, resize=None):
+        """使用cwebp将PNG转换为WebP
+
+        resize: (宽, 高)，提供时由cwebp在编码的同时调整尺寸
+        """
+        if not self.has.cwebp:
             return False
 
         try:
             cmd = [
-                'cwebp',
+                self.tools['cwebp'],
                 '-q', str(min(self.quality + 30, 100)),  # WebP使用更高质量
                 '-m', '6',
                 png_file,
                 '-o', webp_file
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            if self.encoder_threads > 1:
+                cmd.insert(1, '-mt')  # 多线程编码
+            if resize is not None:
+                cmd[1:1] = ['-resize', str(resize[0]), str(resize[1])]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return result.returncode == 0
         except:
             return False
 
-    def _process_single_file(self, input_file, output_file, target_format='avif'):
-        """处理单个文件的完整流程"""
-        input_path = Path(input_file)
-        output_path = Path(output_file)
+    def _read_dimensions(self, file_path, image_format):
+        """从文件头读取PNG/WebP的宽高 (无法解析返回None)"""
+        try:
+            header = self._read_header(file_path, 30)
+        except OSError:
+            return None
 
-        # 检测原始格式
-        original_format = self._detect_image_format(input_file)
+        if image_format == 'png' and len(header) >= 24:
+            # IHDR: 偏移16处为大端序的宽和高
+            return struct.unpack('>II', header[16:24])
+
+        if image_format == 'webp' and len(header) >= 30:
+            chunk = header[12:16]
+            if chunk == b'VP8X':
+                # 扩展格式: 24位小端序的画布宽高减一
+                return (int.from_bytes(header[24:27], 'little') + 1,
+                        int.from_bytes(header[27:30], 'little') + 1)
+            if chunk == b'VP8 ':
+                # 有损格式: 关键帧起始码之后为14位宽高
+                width, height = struct.unpack('<HH', header[26:30])
+                return width & 0x3fff, height & 0x3fff
+            if chunk == b'VP8L':
+                # 无损格式: 签名字节之后为两个14位的宽高减一
+                bits = int.from_bytes(header[21:25], 'little')
+                return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+
+        return None
+
+    def _fit_dimensions(self, file_path, image_format, size):
+        """计算等比缩放到size×size以内的宽高，与sips -Z行为一致 (无法解析返回None)"""
+        dimensions = self._read_dimensions(file_path, image_format)
+        if not dimensions or not all(dimensions):
+            return None
+
+        width, height = dimensions
+        scale = size / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _stage_png(self, input_file, original_format, png_file):
+        """将输入文件转换为PNG，返回可供调整尺寸的文件路径 (失败返回None)"""
+        if original_format in ['png', 'jpeg', 'jpg']:
+            # 直接使用原文件：sips和ImageMagick按内容识别格式，JPEG无需另存为PNG
+            return input_file
+
+        decoder = self._decoders.get(original_format)
+        if decoder is None:
+            self._print(f"    ❌ 不支持的格式或缺少解码工具: {original_format}")
+            return None
+
+        format_name, decode = decoder
+        if not decode(input_file, png_file):
+            self._print(f"    ❌ {format_name} -> PNG 转换失败")
+            return None
+        self._print(f"    ✅ {format_name} -> PNG 转换成功")
+        return png_file
+
+    def _fingerprint(self, input_file, try_formats=('avif', 'webp')):
+        """计算输入文件内容、压缩参数和可用输出格式的指纹"""
+        # 只缓存文件内容部分的哈希，参数部分每次在其副本上追加
+        content_digest = self._fingerprints.get(input_file)
+        if content_digest is None:
+            content_digest = hashlib.blake2b(digest_size=16)
+            with open(input_file, 'rb') as f:
+                content_digest.update(f.read())
+            self._fingerprints[input_file] = content_digest
+
+        digest = content_digest.copy()
+        digest.update(struct.pack('<II', self.target_size, self.quality))
+        # 按优先级排列的可用编码器扩展名，安装新编码器后不再复用降级格式的输出
+        digest.update(''.join(extension for _, extension, _ in self._encoders
+                              if extension[1:] in try_formats).encode('ascii'))
+        return digest.hexdigest()
+
+    def _cached_output(self, input_file, try_formats=('avif', 'webp')):
+        """返回与输入指纹对应且未被改动的输出文件路径及其stat结果 (无缓存返回None)"""
+        if not self.use_cache:
+            return None
+
+        try:
+            fingerprint = self._fingerprint(input_file, try_formats)
+        except OSError:
+            return None
+        entry = self._cache.get(fingerprint)
+        if entry is None:
+            return None
+        cached_relpath, inode, size, mtime_ns = entry
+
+        # 该路径之后被其他内容覆盖时，这条记录已经失效
+        if self._cache_owners.get(cached_relpath) != fingerprint:
+            return None
+
+        cached_path = os.path.join(self.output_dir, cached_relpath)
+        try:
+            cached_stat = os.stat(cached_path)
+        except FileNotFoundError:
+            return None
+        # 文件在记录之后被改写 (如中断的运行或其他参数的运行) 时不再可信
+        if (cached_stat.st_ino, cached_stat.st_size, cached_stat.st_mtime_ns) != (inode, size, mtime_ns):
+            return None
+        return cached_path, cached_stat
+
+    def _reuse_cached_output(self, input_file, output_base, original_size, try_formats=('avif', 'webp')):
+        """输入未变化时复用已有输出，返回处理结果 (无缓存返回None)"""
+        if not self.use_cache:
+            return None
+        try:
+            # 在锁外读取文件计算指纹
+            self._fingerprint(input_file, try_formats)
+        except OSError:
+            return None
+
+        with self._cache_lock:
+            cached = self._cached_output(input_file, try_formats)
+            if cached is None:
+                return None
+            cached_path, cached_stat = cached
+
+            extension = os.path.splitext(cached_path)[1]
+            output_file = output_base + extension
+
+            try:
+                output_stat = os.stat(output_file)
+            except FileNotFoundError:
+                output_stat = None
+
+            # 相同内容的文件已输出到其他位置时，硬链接过来
+            # 先链接到临时路径再替换，不改动输出文件原有的inode
+            if output_stat is None or not os.path.samestat(cached_stat, output_stat):
+                temp_output = self._temp_output_path(output_base, extension)
+                try:
+                    # mkstemp创建的占位文件需先删除才能建立硬链接
+                    os.remove(temp_output)
+                    try:
+                        os.link(cached_path, temp_output)
+                    except OSError:
+                        shutil.copy2(cached_path, temp_output)
+                    os.replace(temp_output, output_file)
+                finally:
+                    if os.path.exists(temp_output):
+                        os.remove(temp_output)
+
+            self._record_cache(input_file, output_file, try_formats)
+
+        self._print(f"    ♻️ 输入未变化，复用已有输出")
+        return True, original_size, cached_stat.st_size, OUTPUT_FORMATS[extension], output_file
+
+    def _forget_cache(self, output_file):
+        """删除指向即将被重写的输出文件的缓存记录"""
+        relpath = os.path.relpath(output_file, self.output_dir)
+        with self._cache_lock:
+            old_fingerprint = self._cache_owners.pop(relpath, None)
+            if old_fingerprint is not None and self._cache.get(old_fingerprint, [None])[0] == relpath:
+                del self._cache[old_fingerprint]
+
+    def _record_cache(self, input_file, output_file, try_formats=('avif', 'webp')):
+        """记录输出文件当前保存的是哪个输入指纹的结果，返回输出文件的stat结果
+
+        使用--no-cache时同样记录，保证之后的运行不会复用被本次覆盖的旧记录
+        """
+        fingerprint = self._fingerprint(input_file, try_formats)
+        relpath = os.path.relpath(output_file, self.output_dir)
+        output_stat = os.stat(output_file)
+        with self._cache_lock:
+            self._forget_cache(output_file)
+            self._cache[fingerprint] = [relpath, output_stat.st_ino, output_stat.st_size, output_stat.st_mtime_ns]
+            self._cache_owners[relpath] = fingerprint
+        return output_stat
+
+    def _load_cache(self):
+        """读取输出目录中的增量缓存"""
+        cache_file = os.path.join(self.output_dir, CACHE_FILENAME)
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        # 忽略格式不符的记录 (如旧版本只保存了路径的记录)
+        self._cache = {fingerprint: entry for fingerprint, entry in cache.items()
+                       if isinstance(entry, list) and len(entry) == 4}
+        self._cache_owners = {entry[0]: fingerprint for fingerprint, entry in self._cache.items()}
+
+    def _save_cache(self):
+        """原子地写入增量缓存 (先写临时文件再重命名)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        cache_file = os.path.join(self.output_dir, CACHE_FILENAME)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f)
+        os.replace(temp_file, cache_file)
+
+    def _temp_output_path(self, output_base, extension):
+        """在输出目录中创建不会与任何输出文件重名的临时文件，返回其路径"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_base) or '.', prefix=TEMP_OUTPUT_PREFIX,
+                                         suffix=extension)
+        os.close(fd)
+        return temp_path
+
+    def _ensure_output_dir(self, output_path):
+        """创建输出路径所在的目录，同一目录只调用一次makedirs"""
+        output_dir = os.path.dirname(output_path)
+        if output_dir and output_dir not in self._created_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            self._created_dirs.add(output_dir)
+
+    def _create_task(self, input_file, output_base, try_formats=('avif', 'webp'), resized_png=None, input_stat=None):
+        """创建单个文件的处理任务，在各处理阶段之间传递状态"""
+        if input_stat is None:
+            input_stat = os.stat(input_file)
+
+        return {
+            'input_file': input_file,
+            'input_stat': input_stat,
+            # 不含扩展名的输出路径，以及按优先级尝试的输出格式
+            'output_base': output_base,
+            'try_formats': try_formats,
+            # 临时文件路径
+            'temp_png_original': input_file + '.temp_orig.png',
+            'temp_png_resized': input_file + '.temp_resized.png',
+            # 编码器写入的临时输出文件，成功后替换为正式输出
+            'temp_output': None,
+            # 检测到的原始格式
+            'format': None,
+            # 当前待处理的PNG (或Pillow图像)，以及是否已完成尺寸调整
+            'png_file': resized_png,
+            'image': None,
+            'resized': resized_png is not None,
+            # 需要由编码器在编码时完成的尺寸调整 (宽, 高)
+            'encode_resize': None,
+            # 处理结束 (成功、失败或复用缓存) 后的结果
+            'result': None,
+            # 该文件的输出缓冲，流水线各阶段线程之间接力使用
+            'log': []
+        }
+
+    def _decode_stage(self, task):
+        """第一阶段：复用缓存或将输入解码为PNG"""
+        input_file = task['input_file']
+        output_base = task['output_base']
 
         # 创建输出目录
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._ensure_output_dir(output_base)
 
-        # 临时文件路径
-        temp_png_original = str(input_path) + '.temp_orig.png'
-        temp_png_resized = str(input_path) + '.temp_resized.png'
+        # 输入内容和参数均未变化时直接复用已有输出
+        task['result'] = self._reuse_cached_output(input_file, output_base, task['input_stat'].st_size,
+                                                   task['try_formats'])
+        if task['result'] is not None or task['resized']:
+            return
+
+        # Pillow可直接读取PNG/JPEG/WebP，一步完成解码和尺寸调整，结果保留在内存中
+        task['image'] = self._resize_with_pillow(input_file, self.target_size)
+        if task['image'] is not None:
+            self._print(f"    ✅ 尺寸调整成功 (Pillow) -> {self.target_size}x{self.target_size}")
+            task['resized'] = True
+            return
 
+        # 检测原始格式
+        original_format = self._detect_image_format(input_file, task['input_stat'])
+        task['format'] = original_format
+
+        # WebP由dwebp在解码的同时调整尺寸，只需一个进程
+        if original_format == 'webp':
+            dimensions = self._fit_dimensions(input_file, 'webp', self.target_size)
+            if dimensions and self._convert_webp_to_png(input_file, task['temp_png_resized'], resize=dimensions):
+                self._print(f"    ✅ WebP -> PNG 尺寸调整成功 (dwebp) -> {dimensions[0]}x{dimensions[1]}")
+                task['png_file'] = task['temp_png_resized']
+                task['resized'] = True
+                return
+
+        # WebP经管道直接送入ImageMagick，解码结果不落盘
+        if original_format == 'webp' and not self.has.sips:
+            if self._resize_webp_with_pipeline(input_file, task['temp_png_resized'], self.target_size):
+                self._print(f"    ✅ WebP -> PNG 尺寸调整成功 (管道) -> {self.target_size}x{self.target_size}")
+                task['png_file'] = task['temp_png_resized']
+                task['resized'] = True
+                return
+
+        # 转换为PNG（如果需要）
+        task['png_file'] = self._stage_png(input_file, original_format, task['temp_png_original'])
+        if task['png_file'] is None:
+            task['result'] = (False, 0, 0)
+
+    def _resize_stage(self, task):
+        """第二阶段：调整PNG尺寸"""
+        if task['result'] is not None or task['resized']:
+            return
+
+        staged_png = task['png_file']
+        temp_png_resized = task['temp_png_resized']
+        task['resized'] = True
+
+        # 只能输出WebP时，PNG由cwebp在编码的同时调整尺寸
+        if task['format'] == 'png' and self._encoders and self._encoders[0][1] == '.webp':
+            task['encode_resize'] = self._fit_dimensions(staged_png, 'png', self.target_size)
+            if task['encode_resize'] is not None:
+                return
+
+        for tool_name, resize in self._resizers:
+            if resize(staged_png, temp_png_resized, self.target_size):
+                self._print(f"    ✅ 尺寸调整成功 ({tool_name}) -> {self.target_size}x{self.target_size}")
+                task['png_file'] = temp_png_resized
+                return
+
+        # 如果调整尺寸失败，直接使用原PNG
+        self._print(f"    ⚠️ 尺寸调整失败，使用原始尺寸")
+
+    def _task_png(self, task):
+        """返回任务待编码的PNG路径，内存中的图像在首次需要时才写出"""
+        if task['png_file'] is None and task['image'] is not None:
+            task['image'].save(task['temp_png_resized'], 'PNG')
+            task['png_file'] = task['temp_png_resized']
+        return task['png_file']
+
+    def _encode_stage(self, task):
+        """第三阶段：按优先级转换为目标格式 (AVIF优先，WebP降级)"""
+        if task['result'] is not None:
+            return
+
+        for output_format, extension, encode in self._encoders:
+            if extension[1:] not in task['try_formats']:
+                continue
+
+            output_file = task['output_base'] + extension
+            # 先编码到临时文件，成功后再替换输出文件
+            # 编码器会就地改写已存在的文件，直接写入会连带修改与之硬链接的其他输出
+            temp_output = task['temp_output'] = self._temp_output_path(task['output_base'], extension)
+
+            # 内存中的图像直接以Y4M送入avifenc，失败时退回PNG输入
+            if extension == '.avif' and task['image'] is not None:
+                if self._convert_image_to_avif(task['image'], temp_output):
+                    self._print(f"    ✅ Y4M -> {output_format} 转换成功 (管道)")
+                    break
+
+            if task['encode_resize'] is not None:
+                width, height = task['encode_resize']
+                if self._convert_png_to_webp(self._task_png(task), temp_output, resize=task['encode_resize']):
+                    self._print(f"    ✅ PNG -> {output_format} 转换并调整尺寸成功 (cwebp) -> {width}x{height}")
+                    break
+            elif encode(self._task_png(task), temp_output):
+                self._print(f"    ✅ PNG -> {output_format} 转换成功")
+                break
+
+            if os.path.exists(temp_output):
+                os.remove(temp_output)
+            task['temp_output'] = None
+        else:
+            self._print(f"    ❌ 格式转换失败")
+            task['result'] = (False, 0, 0)
+            return
+
+        # 替换与更新缓存记录同时完成，其他线程不会链接到内容与记录不一致的文件
+        with self._cache_lock:
+            os.replace(temp_output, output_file)
+            task['temp_output'] = None
+            output_stat = self._record_cache(task['input_file'], output_file, task['try_formats'])
+
+        # 获取文件大小
+        original_size = task['input_stat'].st_size
+        task['result'] = (True, original_size, output_stat.st_size, output_format, output_file)
+
+    def _cleanup_task(self, task):
+        """清理任务的临时文件"""
+        for temp_file in [task['temp_png_original'], task['temp_png_resized'], task['temp_output']]:
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _process_single_file(self, input_file, output_base, *, try_formats=('avif', 'webp'), resized_png=None,
+                             input_stat=None):
+        """处理单个文件的完整流程
+
+        output_base: 不含扩展名的输出路径，实际扩展名由成功的编码器决定
+        try_formats: 按优先级尝试的输出格式
+        resized_png: 已经批量完成解码和尺寸调整的PNG，提供时跳过前两步
+        input_stat: 扫描目录时已获得的stat结果，避免重复stat
+        """
+        task = self._create_task(input_file, output_base, try_formats, resized_png, input_stat)
         try:
-            # 第一步：转换为PNG（如果需要）
-            if original_format == 'png':
-                temp_png_original = str(input_file)  # 直接使用原文件
-            elif original_format == 'webp':
-                if not self._convert_webp_to_png(input_file, temp_png_original):
-                    self._print(f"    ❌ WebP -> PNG 转换失败")
-                    return False, 0, 0
-                self._print(f"    ✅ WebP -> PNG 转换成功")
-            elif original_format == 'avif':
-                if not self._convert_avif_to_png(input_file, temp_png_original):
-                    self._print(f"    ❌ AVIF -> PNG 转换失败")
-                    return False, 0, 0
-                self._print(f"    ✅ AVIF -> PNG 转换成功")
-            elif original_format in ['jpeg', 'jpg']:
-                # JPEG直接复制为PNG处理
-                shutil.copy2(input_file, temp_png_original)
-            else:
-                self._print(f"    ❌ 不支持的格式: {original_format}")
-                return False, 0, 0
-
-            # 第二步：调整尺寸
-            resize_success = False
-
-            # 尝试sips (macOS)
-            if 'sips' in self.available_tools:
-                resize_success = self._resize_with_sips(temp_png_original, temp_png_resized, self.target_size)
-                if resize_success:
-                    self._print(f"    ✅ 尺寸调整成功 (sips) -> {self.target_size}x{self.target_size}")
-
-            # 尝试ImageMagick
-            if not resize_success:
-                resize_success = self._resize_with_imagemagick(temp_png_original, temp_png_resized, self.target_size)
-                if resize_success:
-                    self._print(f"    ✅ 尺寸调整成功 (ImageMagick) -> {self.target_size}x{self.target_size}")
-
-            if not resize_success:
-                # 如果调整尺寸失败，直接使用原PNG
-                temp_png_resized = temp_png_original
-                self._print(f"    ⚠️ 尺寸调整失败，使用原始尺寸")
-
-            # 第三步：转换为目标格式
-            conversion_success = False
-            actual_output_format = ""
-
-            if target_format == 'avif' and 'avifenc' in self.available_tools:
-                # 优先转换为AVIF
-                avif_output = str(output_path).replace('.webp', '.avif')
-                if not avif_output.endswith('.avif'):
-                    avif_output = str(output_path.with_suffix('.avif'))
-
-                conversion_success = self._convert_png_to_avif(temp_png_resized, avif_output)
-                if conversion_success:
-                    actual_output_format = "AVIF"
-                    actual_output_file = avif_output
-                    self._print(f"    ✅ PNG -> AVIF 转换成功")
-
-            if not conversion_success and 'cwebp' in self.available_tools:
-                # 降级到WebP
-                webp_output = str(output_path).replace('.avif', '.webp')
-                if not webp_output.endswith('.webp'):
-                    webp_output = str(output_path.with_suffix('.webp'))
-
-                conversion_success = self._convert_png_to_webp(temp_png_resized, webp_output)
-                if conversion_success:
-                    actual_output_format = "WebP"
-                    actual_output_file = webp_output
-                    self._print(f"    ✅ PNG -> WebP 转换成功")
-
-            if not conversion_success:
-                self._print(f"    ❌ 格式转换失败")
-                return False, 0, 0
-
-            # 获取文件大小
-            original_size = os.path.getsize(input_file)
-            new_size = os.path.getsize(actual_output_file) if os.path.exists(actual_output_file) else 0
-
-            return True, original_size, new_size, actual_output_format, actual_output_file
+            self._decode_stage(task)
+            self._resize_stage(task)
+            self._encode_stage(task)
+            return task['result']
+        finally:
+            self._cleanup_task(task)
+
+    def _output_base_for(self, image_file, output_platform_dir):
+        """生成图片文件 (os.DirEntry) 对应的不含扩展名的输出路径"""
+        return os.path.join(output_platform_dir, os.path.splitext(image_file.name)[0])
+
+    def _process_image_file(self, image_file, output_platform_dir, resized_png=None):
+        """处理单个图片文件 (扫描得到的os.DirEntry) 并生成结果记录"""
+        self._begin_log()
+        try:
+            self._print(f"\n🔄 处理: {image_file.name}")
+
+            # 处理文件
+            result = self._process_single_file(image_file.path, self._output_base_for(image_file, output_platform_dir),
+                                               resized_png=resized_png, input_stat=image_file.stat())
+
+            return self._build_file_result(image_file, result)
+        except Exception as e:
+            # 单个文件的异常只导致该文件失败，不中断线程池中的其他文件
+            self._print(f"    ❌ 处理异常: {e}")
+            return {'original_file': image_file.name, 'success': False}
+        finally:
+            self._flush_log()
+
+    def _build_file_result(self, image_file, result):
+        """根据处理结果生成单个文件的结果记录"""
+        if result[0]:  # 成功
+            original_size = result[1]
+            new_size = result[2]
+            output_format = result[3]
+            actual_output_file = result[4]
+
+            compression_ratio = (original_size - new_size) / original_size * 100 if original_size > 0 else 0
+
+            file_result = {
+                'original_file': str(image_file.name),
+                'new_file': os.path.basename(actual_output_file),
+                'output_format': output_format,
+                'original_size': original_size,
+                'new_size': new_size,
+                'compression_ratio': compression_ratio,
+                'target_size': f"{self.target_size}×{self.target_size}",
+                'success': True
+            }
 
+            self._print(f"    📊 {original_size} -> {new_size} bytes ({output_format}, 压缩率: {compression_ratio:.1f}%)")
+        else:
+            file_result = {
+                'original_file': str(image_file.name),
+                'success': False
+            }
+            self._print(f"    ❌ 处理失败")
+
+        return file_result
+
+    def _run_stage(self, stage, task):
+        """在流水线线程中执行处理阶段，异常只导致该文件失败，不阻塞其他阶段"""
+        try:
+            stage(task)
+        except Exception as e:
+            self._print(f"    ❌ 处理异常: {e}")
+            task['result'] = (False, 0, 0)
+
+    def _process_files_pipelined(self, image_files, output_platform_dir):
+        """三级流水线：解码、调整尺寸、编码各占一个线程，同时处理不同文件"""
+        resize_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        encode_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        file_results = [None] * len(image_files)
+
+        # 每个文件的异常都只导致该文件失败，结束标记总会放入队列，任何线程退出都不会使其他线程永久阻塞
+        def decode_worker():
+            try:
+                for index, image_file in enumerate(image_files):
+                    task = None
+                    try:
+                        task = self._create_task(image_file.path,
+                                                 self._output_base_for(image_file, output_platform_dir),
+                                                 input_stat=image_file.stat())
+                        self._begin_log(task['log'])
+                        self._print(f"\n🔄 处理: {image_file.name}")
+                        self._run_stage(self._decode_stage, task)
+                    except Exception as e:
+                        self._print(f"    ❌ 处理异常: {image_file.name}: {e}")
+                        if task is not None:
+                            task['result'] = (False, 0, 0)
+                    finally:
+                        self._end_log()
+                    # 任务创建失败时传递None，由编码线程记录失败结果
+                    resize_queue.put((index, task))
+            finally:
+                resize_queue.put(None)  # 结束标记
+
+        def resize_worker():
+            try:
+                for index, task in iter(resize_queue.get, None):
+                    if task is not None:
+                        self._begin_log(task['log'])
+                        try:
+                            self._run_stage(self._resize_stage, task)
+                        finally:
+                            self._end_log()
+                    encode_queue.put((index, task))
+            finally:
+                encode_queue.put(None)
+
+        def encode_worker():
+            for index, task in iter(encode_queue.get, None):
+                if task is None:
+                    file_results[index] = {'original_file': image_files[index].name, 'success': False}
+                    continue
+
+                self._begin_log(task['log'])
+                try:
+                    self._run_stage(self._encode_stage, task)
+                    self._cleanup_task(task)
+                    file_results[index] = self._build_file_result(image_files[index], task['result'])
+                except Exception as e:
+                    self._print(f"    ❌ 处理异常: {e}")
+                    file_results[index] = {'original_file': image_files[index].name, 'success': False}
+                finally:
+                    self._flush_log()
+
+        workers = [threading.Thread(target=worker) for worker in (decode_worker, resize_worker, encode_worker)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        return file_results
+
+    def _stage_for_batch(self, image_file, staged_png):
+        """批量模式第一阶段：将单个文件 (os.DirEntry) 转换为暂存目录中的PNG"""
+        # 可复用已有输出的文件无需参与批量处理
+        if self._cached_output(image_file.path) is not None:
+            return False
+
+        original_format = self._detect_image_format(image_file.path, image_file.stat())
+        # WebP留给逐个处理，由dwebp在解码的同时调整尺寸，避免全尺寸解码后再交给mogrify
+        if original_format == 'webp' and self.has.dwebp:
+            return False
+
+        self._begin_log()
+        try:
+            self._print(f"\n🔄 解码: {image_file.name}")
+            png_file = self._stage_png(image_file.path, original_format, staged_png)
+        except Exception as e:
+            # 暂存失败的文件退回逐个处理
+            self._print(f"    ❌ 处理异常: {e}")
+            png_file = None
         finally:
-            # 清理临时文件
-            for temp_file in [temp_png_original, temp_png_resized]:
-                if temp_file != str(input_file) and os.path.exists(temp_file):
-                    os.remove(temp_file)
+            self._flush_log()
+        if png_file is None:
+            return False
+
+        if png_file != staged_png:
+            # PNG原文件通过硬链接放入暂存目录，避免复制
+            try:
+                os.link(png_file, staged_png)
+            except OSError:
+                shutil.copy2(png_file, staged_png)
+        return True
+
+    def _process_files_batched(self, image_files, output_platform_dir):
+        """批量处理：并发解码 -> 一次mogrify调整尺寸 -> 并发编码"""
+        with tempfile.TemporaryDirectory(prefix='emoji_') as temp_dir:
+            staging_dir = os.path.join(temp_dir, 'staged')
+            resized_dir = os.path.join(temp_dir, 'resized')
+            os.makedirs(staging_dir)
+            os.makedirs(resized_dir)
+
+            # 按序号命名暂存文件，避免同名不同扩展名的文件互相覆盖
+            staged_names = [f'{index:05d}.png' for index in range(len(image_files))]
+
+            # 第一阶段：统一转换为PNG
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                staged = list(executor.map(
+                    lambda image_file, name: self._stage_for_batch(image_file, os.path.join(staging_dir, name)),
+                    image_files, staged_names
+                ))
+
+            # 第二阶段：一次性调整所有文件的尺寸
+            if any(staged):
+                if self._batch_resize_imagemagick(staging_dir, resized_dir, self.target_size):
+                    self._print(f"\n✅ 批量尺寸调整成功 (ImageMagick mogrify) -> {self.target_size}x{self.target_size}")
+                else:
+                    self._print(f"\n⚠️ 批量尺寸调整失败，逐个文件处理")
+
+            # 第三阶段：并发编码，批量阶段未产出的文件退回逐个处理
+            def encode(image_file, name):
+                resized_png = os.path.join(resized_dir, name)
+                if not os.path.exists(resized_png):
+                    resized_png = None
+                return self._process_image_file(image_file, output_platform_dir, resized_png)
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                return list(executor.map(encode, image_files, staged_names))
 
     def _process_platform_directory(self, platform_name, platform_dir):
         """处理单个平台目录"""
-        input_platform_dir = Path(self.input_dir) / platform_name
-        output_platform_dir = Path(self.output_dir) / platform_dir
+        input_platform_dir = os.path.join(self.input_dir, platform_name)
+        output_platform_dir = os.path.join(self.output_dir, platform_dir)
 
-        if not input_platform_dir.exists():
+        if not os.path.exists(input_platform_dir):
             self._print(f"⚠️ 平台目录不存在: {input_platform_dir}")
             return []
 
         # 找到所有图片文件
-        image_extensions = ['.png', '.jpg', '.jpeg', '.webp', '.avif', '.gif']
-        image_files = []
-
-        for ext in image_extensions:
-            image_files.extend(input_platform_dir.glob(f'*{ext}'))
-            image_files.extend(input_platform_dir.glob(f'*{ext.upper()}'))
+        # 一次遍历目录，保留DirEntry以复用其stat结果
+        with os.scandir(input_platform_dir) as entries:
+            image_files = sorted(
+                (entry for entry in entries
+                 if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)),
+                key=lambda entry: entry.name
+            )
 
         if not image_files:
             self._print(f"⚠️ {platform_name} 目录中没有图片文件")
@@ -304,47 +1078,28 @@ class EmojiCompressor:
         total_new_size = 0
         format_counts = {}
 
-        for image_file in image_files:
-            self._print(f"\n🔄 处理: {image_file.name}")
-
-            # 生成输出文件路径
-            output_file = output_platform_dir / (image_file.stem + '.avif')
-
-            # 处理文件
-            result = self._process_single_file(str(image_file), str(output_file))
-
-            if result[0]:  # 成功
+        if self.jobs == 1:
+            # 单线程时以流水线方式重叠不同文件的解码、调整尺寸和编码
+            file_results = self._process_files_pipelined(image_files, output_platform_dir)
+        elif self.has.magick and not self.has.pillow and not self.has.sips:
+            # 没有Pillow和sips时使用ImageMagick批量调整尺寸，避免每个文件单独启动进程
+            file_results = self._process_files_batched(image_files, output_platform_dir)
+        else:
+            # 各文件相互独立，耗时集中在外部编码器子进程中，使用线程池并发处理
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                file_results = list(executor.map(
+                    lambda image_file: self._process_image_file(image_file, output_platform_dir),
+                    image_files
+                ))
+
+        for file_result in file_results:
+            if file_result['success']:
                 success_count += 1
-                original_size = result[1]
-                new_size = result[2]
-                output_format = result[3]
-                actual_output_file = result[4]
-
-                total_original_size += original_size
-                total_new_size += new_size
-
-                compression_ratio = (original_size - new_size) / original_size * 100 if original_size > 0 else 0
+                total_original_size += file_result['original_size']
+                total_new_size += file_result['new_size']
+                output_format = file_result['output_format']
                 format_counts[output_format] = format_counts.get(output_format, 0) + 1
 
-                file_result = {
-                    'original_file': str(image_file.name),
-                    'new_file': os.path.basename(actual_output_file),
-                    'output_format': output_format,
-                    'original_size': original_size,
-                    'new_size': new_size,
-                    'compression_ratio': compression_ratio,
-                    'target_size': f"{self.target_size}×{self.target_size}",
-                    'success': True
-                }
-
-                self._print(f"    📊 {original_size} -> {new_size} bytes ({output_format}, 压缩率: {compression_ratio:.1f}%)")
-            else:
-                file_result = {
-                    'original_file': str(image_file.name),
-                    'success': False
-                }
-                self._print(f"    ❌ 处理失败")
-
             results.append(file_result)
 
         # 平台处理总结
@@ -368,8 +1123,8 @@ class EmojiCompressor:
         self._print("🚀 Emoji压缩转换工具启动", force=True)
         self._print("=" * 70, force=True)
 
-        # 检查必要工具
-        if not self.available_tools:
+        # 检查必要工具 (Pillow和ImageMagick只负责解码和调整尺寸，必须有AVIF或WebP编码器)
+        if not self._encoders:
             self._print("❌ 没有找到任何可用的转换工具", force=True)
             self._print("请安装以下工具之一:", force=True)
             self._print("  - libavif: brew install libavif", force=True)
@@ -382,16 +1137,24 @@ class EmojiCompressor:
         self._print(f"  输出目录: {self.output_dir}", force=True)
         self._print(f"  目标尺寸: {self.target_size}×{self.target_size}", force=True)
         self._print(f"  质量设置: {self.quality}", force=True)
+        self._print(f"  并发数: {self.jobs} (每个编码器 {self.encoder_threads} 线程)", force=True)
         self._print(f"  可用工具: {', '.join(self.available_tools)}", force=True)
 
+        # 使用--no-cache时也读取并更新缓存，只是不复用已有输出
+        self._load_cache()
+
         # 处理所有平台
         all_results = {}
 
-        for platform_name, platform_dir in self.platform_mapping.items():
-            self._print(f"\n{'='*70}", force=True)
-            results = self._process_platform_directory(platform_name, platform_dir)
-            if results:
-                all_results[platform_name] = results
+        try:
+            for platform_name, platform_dir in self.platform_mapping.items():
+                self._print(f"\n{'='*70}", force=True)
+                results = self._process_platform_directory(platform_name, platform_dir)
+                if results:
+                    all_results[platform_name] = results
+        finally:
+            # 运行中断时也保存已更新的记录
+            self._save_cache()
 
         # 生成总体报告
         self._generate_final_report(all_results)
@@ -413,19 +1176,24 @@ class EmojiCompressor:
         platform_stats = {}
 
         for platform, results in all_results.items():
-            success_count = sum(1 for r in results if r.get('success', False))
             total_count = len(results)
 
-            platform_original_size = sum(r.get('original_size', 0) for r in results if r.get('success', False))
-            platform_new_size = sum(r.get('new_size', 0) for r in results if r.get('success', False))
-
-            # 统计格式
+            # 单次遍历累计成功数、大小和格式分布
+            success_count = 0
+            platform_original_size = 0
+            platform_new_size = 0
             platform_formats = {}
+            get_format_count = platform_formats.get
             for r in results:
                 if r.get('success', False):
+                    success_count += 1
+                    platform_original_size += r.get('original_size', 0)
+                    platform_new_size += r.get('new_size', 0)
                     fmt = r.get('output_format', 'unknown')
-                    platform_formats[fmt] = platform_formats.get(fmt, 0) + 1
-                    format_counts[fmt] = format_counts.get(fmt, 0) + 1
+                    platform_formats[fmt] = get_format_count(fmt, 0) + 1
+
+            for fmt, count in platform_formats.items():
+                format_counts[fmt] = format_counts.get(fmt, 0) + count
 
             platform_stats[platform] = {
                 'total_files': total_count,
@@ -489,8 +1257,11 @@ class EmojiCompressor:
         self._print(f"\n📁 压缩文件保存在: {self.output_dir}/", force=True)
 
     def _save_report_to_file(self, all_results, platform_stats, summary):
-        """保存详细报告到文件"""
-        report_data = {
+        """保存详细报告到文件
+
+        detailed_results按文件逐条写出，不在内存中生成整份报告的JSON文本
+        """
+        report_header = {
             'timestamp': datetime.now().isoformat(),
             'configuration': {
                 'input_directory': self.input_dir,
@@ -500,14 +1271,26 @@ class EmojiCompressor:
                 'available_tools': self.available_tools
             },
             'summary': summary,
-            'platforms': platform_stats,
-            'detailed_results': all_results
+            'platforms': platform_stats
         }
 
         report_filename = f'emoji_compression_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
 
-        with open(report_filename, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+        with open(report_filename, 'wb') as f:
+            # 头部字段体积很小，整体序列化后去掉末尾的 '}' 继续追加
+            f.write(_dumps_json(report_header).rstrip()[:-1].rstrip())
+            f.write(b',\n  "detailed_results": {')
+
+            for platform_index, (platform, results) in enumerate(all_results.items()):
+                if platform_index:
+                    f.write(b',')
+                f.write(b'\n    ' + _dumps_json(platform, indent=False) + b': [')
+                for index, file_result in enumerate(results):
+                    f.write(b',\n      ' if index else b'\n      ')
+                    f.write(_dumps_json(file_result, indent=False))
+                f.write(b'\n    ]')
+
+            f.write(b'\n  }\n}\n')
 
         self._print(f"💾 详细报告已保存到: {report_filename}", force=True)
 
@@ -522,6 +1305,10 @@ def main():
                        help='目标尺寸 (默认: 60)')
     parser.add_argument('--quality', '-q', type=int, default=50,
                        help='压缩质量 0-100 (默认: 50)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                       help='并发处理的文件数 (默认: CPU核心数)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='忽略增量缓存，重新转换所有文件')
     parser.add_argument('--quiet', action='store_true',
                        help='静默模式，只显示关键信息')
 
@@ -533,7 +1320,9 @@ def main():
         output_dir=args.output,
         target_size=args.size,
         quality=args.quality,
-        verbose=not args.quiet
+        verbose=not args.quiet,
+        jobs=args.jobs,
+        use_cache=not args.no_cache
     )
 
     # 执行压缩